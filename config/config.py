@@ -30,6 +30,10 @@ COLLAPSE_CHAINS = False        # If True, collapse chains of single-child folder
 # Token estimation (used for percentage of ChatGPT project limit)
 TOKEN_LIMIT = 75000
 
+# Sharded output (--shard): token budget per snapshot file and formatting workers
+SHARD_TOKEN_BUDGET = 20000
+SHARD_WORKERS = 0             # 0 = one worker process per CPU
+
 # Toggle for eliminating macOS invisible icon files
 ICON_ELIMINATION = True
 
@@ -40,12 +44,39 @@ IGNORE_HIDDEN = True
 MAX_FILES_DISPLAY = 0         # If exceeded, output summary instead
                               # Set to 0 to show only folders (no files)
 
+# Extension histogram in "[omitted N files: ...]" summaries: most common types shown
+OMITTED_TYPES_TOP_K = 3       # Set to 0 for a plain "[omitted N files]" summary
+
+# Du-style folder rollups: total size, file count and newest file month per folder
+SHOW_FOLDER_SIZES = False     # Also enabled per run with --sizes
+FOLDER_SIZE_MIN_BYTES = 0     # Only annotate folders at least this large (e.g. 1024**3 for 1 GB)
+
 # Maximum depth to scan (0 = unlimited, 1 = only root level, 2 = root + 1 level, etc.)
 MAX_SCAN_DEPTH = 5  # 0 means unlimited depth
 
+# Async traversal backend (--async), for high-latency mounts (network/cloud FUSE).
+# Directory reads run in threads; the number in flight adapts to observed latency
+# (additive increase while latency stays near the best seen, halving when it climbs).
+USE_ASYNC_SCAN = False          # Also enabled per run with --async
+ASYNC_MIN_CONCURRENCY = 4
+ASYNC_MAX_CONCURRENCY = 128
+ASYNC_LATENCY_TOLERANCE = 2.0   # Back off when latency exceeds this multiple of the best seen
+ASYNC_LATENCY_FLOOR = 0.005     # Seconds; latencies below this never trigger back-off
+
 # Toggle for output file extension
 USE_TXT_EXTENSION = True
 
+# Sorting behavior (Finder emulation)
+NATURAL_SORT = True           # If True, "file2" sorts before "file10" (Finder-style numbers)
+USE_LOCALE_COLLATION = True   # If True, compare names with the locale's collation (strxfrm)
+
+# Persistent repository index (written by repo-mode scans, read by --repo-only)
+REPO_INDEX_FILE = OUTPUT_DIR + '/repo_index.json'
+
+# Budget for scanning one tar-family archive for repository markers in repo mode
+ARCHIVE_SCAN_MAX_BYTES = 64 * 1024 * 1024   # Bytes read from disk (compressed size)
+ARCHIVE_SCAN_TIMEOUT = 2.0                  # Seconds
+
 # Repository detection settings
 REPO_TYPES = {
     'git': ['.git'],
@@ -11,11 +11,16 @@ from config.config import (
     OUTPUT_DIR,
     USE_TREE_FORMAT,
     USE_TXT_EXTENSION,
+    SHOW_FOLDER_SIZES,
+    USE_ASYNC_SCAN,
+    SHARD_TOKEN_BUDGET,
+    SHARD_WORKERS,
 )
 
 # Package imports - organized by module
-from trimmer.scanner import scan_directory, initial_count
+from trimmer.scanner import scan_directory, scan_repo_only, initial_count
 from trimmer.formatter import format_tree_output, format_flat_output, estimate_tokens
+from trimmer.sharding import write_shards
 from trimmer.stats import print_stats
 from trimmer.utils import load_ignore_types, load_ignore_patterns  # Add load_ignore_patterns
 
@@ -26,51 +31,82 @@ def main():
                        help="Enable repository detection mode (folders only)")
     group.add_argument('--repo-files', action='store_true',
                        help="Enable repository detection with file display")
+    group.add_argument('--repo-only', '--repo_only', dest='repo_only', action='store_true',
+                       help="Show only repositories and their ancestor folders (uses the repo index)")
+    parser.add_argument('--rescan', action='store_true',
+                        help="With --repo-only, ignore the repo index and walk the full tree")
+    parser.add_argument('--sizes', action='store_true',
+                        help="Annotate folders with total size, file count and newest file month")
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help="Use the asyncio traversal backend (for network/cloud mounts)")
+    parser.add_argument('--shard', nargs='?', type=int, const=SHARD_TOKEN_BUDGET, default=None,
+                        metavar='TOKENS',
+                        help="Split tree output into snapshots of at most TOKENS tokens each "
+                             f"(default {SHARD_TOKEN_BUDGET:,}) plus an index file")
     args = parser.parse_args()
+    if args.shard is not None and args.shard <= 0:
+        parser.error("--shard: TOKENS must be a positive number")
+    if args.shard is not None and not USE_TREE_FORMAT:
+        parser.error("--shard needs tree output (set USE_TREE_FORMAT = True)")
 
     # Derive internal flags
     enable_repo = args.repo or args.repo_files
     repo_show_files = args.repo_files
+    use_async = args.use_async or USE_ASYNC_SCAN
 
     # Load ignore types and patterns
     ignore_types = load_ignore_types()
     ignore_patterns = load_ignore_patterns()
 
-    # Perform filtered scan
-    tree_lines, flat_lines, filtered_stats = scan_directory(SOURCE_DIR, ignore_types, ignore_patterns, enable_repo, repo_show_files)
-
-    # Format output
-    tree_text = format_tree_output(tree_lines)
-    flat_text = format_flat_output(flat_lines)
-    selected_output = tree_text if USE_TREE_FORMAT else flat_text
+    # Perform filtered scan (repo-only view comes from the repo index when valid)
+    if args.repo_only:
+        tree_lines, flat_lines, filtered_stats = scan_repo_only(SOURCE_DIR, ignore_types, ignore_patterns, args.rescan, use_async)
+    else:
+        tree_lines, flat_lines, filtered_stats = scan_directory(SOURCE_DIR, ignore_types, ignore_patterns, enable_repo, repo_show_files,
+                                                                show_sizes=args.sizes or SHOW_FOLDER_SIZES, use_async=use_async)
 
     # Generate dynamic output filename
     timestamp = datetime.now().strftime("%y%m%d-%H%M")
     source_name = os.path.basename(os.path.normpath(SOURCE_DIR))
     ext = "txt" if USE_TXT_EXTENSION else "yaml"
-    output_filename = f"{timestamp} {source_name} structure_snapshot.{ext}"
-    output_path = os.path.join(OUTPUT_DIR, output_filename)
+    base_name = f"{timestamp} {source_name} structure_snapshot"
 
-    # Write output to file
-    with open(output_path, 'w') as f:
-        f.write(selected_output)
+    if args.shard is not None:
+        # Sharded output: shards are formatted and written in parallel
+        index_path, shards = write_shards(tree_lines, OUTPUT_DIR, base_name, ext, args.shard, SHARD_WORKERS)
+        tokens = sum(shard['tokens'] for shard in shards)
+        output_size = sum(shard['bytes'] for shard in shards)
+        filtered_stats['shards_written'] = len(shards)
+        filtered_stats['largest_shard_tokens'] = max((shard['tokens'] for shard in shards), default=0)
+    else:
+        # Format output
+        tree_text = format_tree_output(tree_lines)
+        flat_text = format_flat_output(flat_lines)
+        selected_output = tree_text if USE_TREE_FORMAT else flat_text
 
-    # Estimate token usage based on tree format
-    tokens = estimate_tokens(tree_text)
-    output_size = len(selected_output.encode('utf-8'))
+        output_path = os.path.join(OUTPUT_DIR, f"{base_name}.{ext}")
 
-    # Raw inventory (pre-filter baseline)
-    raw_stats = initial_count(SOURCE_DIR)
+        # Write output to file
+        with open(output_path, 'w') as f:
+            f.write(selected_output)
 
-    # Print raw inventory to console
-    print()
-    print("Raw Directory Inventory:")
-    print(f"  Total Folders: {raw_stats['total_folders']}")
-    print(f"  Total Files: {raw_stats['total_files']}")
-    print(f"    - Image Files: {raw_stats['image_files']}")
-    print(f"    - Markdown Files: {raw_stats['markdown_files']}")
-    print(f"    - Icon Files: {raw_stats['icon_files']}")
+        # Estimate token usage based on tree format
+        tokens = estimate_tokens(tree_text)
+        output_size = len(selected_output.encode('utf-8'))
+
+    # Raw inventory (pre-filter baseline) - a full walk, so skipped in repo-only mode
     print()
+    if not args.repo_only:
+        raw_stats = initial_count(SOURCE_DIR)
+
+        # Print raw inventory to console
+        print("Raw Directory Inventory:")
+        print(f"  Total Folders: {raw_stats['total_folders']}")
+        print(f"  Total Files: {raw_stats['total_files']}")
+        print(f"    - Image Files: {raw_stats['image_files']}")
+        print(f"    - Markdown Files: {raw_stats['markdown_files']}")
+        print(f"    - Icon Files: {raw_stats['icon_files']}")
+        print()
 
     # Print filtered results and token usage
     print_stats(filtered_stats, tokens, output_size)
@@ -6,7 +6,7 @@ optimized for use with large language models.
 """
 
 # Import and re-export the public API
-from .scanner import scan_directory, initial_count
+from .scanner import scan_directory, scan_repo_only, initial_count
 from .formatter import format_tree_output, format_flat_output, estimate_tokens
 from .stats import print_stats
 from .utils import load_ignore_types
@@ -16,6 +16,7 @@ from .sorting import finder_sort_key
 # Define what gets imported with "from folderstructure import *"
 __all__ = [
     'scan_directory', 
+    'scan_repo_only',
     'initial_count',
     'format_tree_output', 
     'format_flat_output', 
@@ -0,0 +1,225 @@
+"""
+Asyncio traversal backend for high-latency file systems.
+
+Directory reads (scandir, stat, xattr, archive and repo checks) run in a
+thread pool, so many can be in flight at once. How many is adjusted from
+the latency actually observed (AIMD): the limit grows by about one per
+round of requests while latency stays near the best seen, and is halved
+when latency climbs. A fast local disk ramps up to ASYNC_MAX_CONCURRENCY,
+while a saturated network or FUSE mount settles at what it can serve.
+
+Output is built with the same assemble_directory as the serial backend, so
+lines and stats match process_directory exactly.
+"""
+import os
+import time
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from config.config import (
+    IGNORE_HIDDEN,
+    ASYNC_MIN_CONCURRENCY,
+    ASYNC_MAX_CONCURRENCY,
+    ASYNC_LATENCY_TOLERANCE,
+    ASYNC_LATENCY_FLOOR,
+)
+
+from .filesystem import read_directory, plan_subdirectories, assemble_directory, within_scan_depth
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit for blocking calls, adjusted AIMD-style from latency.
+
+    Callers over the limit wait in FIFO order, and each released slot is
+    handed to exactly one waiter.
+
+    Args:
+        min_limit: Lowest number of calls allowed in flight
+        max_limit: Highest number of calls allowed in flight
+        tolerance: Back off when latency exceeds this multiple of the best seen
+        floor: Latencies below this many seconds never trigger a back-off
+    """
+
+    def __init__(self, min_limit, max_limit, tolerance, floor):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.floor = floor
+        self.limit = float(min_limit)
+        self.in_flight = 0
+        self.best_latency = None
+        self.peak_limit = self.limit
+        self._last_decrease = 0.0
+        self._waiters = deque()
+
+    def _observe(self, latency, finished_at):
+        if self.best_latency is None or latency < self.best_latency:
+            self.best_latency = latency
+
+        if latency <= max(self.best_latency * self.tolerance, self.floor):
+            # Additive increase: about +1 per full window of fast calls
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            self.peak_limit = max(self.peak_limit, self.limit)
+        elif finished_at - self._last_decrease > latency:
+            # Multiplicative decrease, at most once per round trip
+            self.limit = max(self.min_limit, self.limit / 2)
+            self._last_decrease = finished_at
+
+    def _wake(self):
+        """Hand free slots to waiters, oldest first."""
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    async def _acquire(self):
+        if not self._waiters and self.in_flight < int(self.limit):
+            self.in_flight += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            # A slot handed over just before cancellation must be given back
+            if waiter.done() and not waiter.cancelled():
+                self._release()
+            raise
+
+    def _release(self):
+        self.in_flight -= 1
+        self._wake()
+
+    async def run(self, executor, func, *args):
+        """Run a blocking call in the executor once a slot is free."""
+        await self._acquire()
+        start = time.monotonic()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+        finally:
+            finished_at = time.monotonic()
+            self._observe(finished_at - start, finished_at)
+            self._release()
+
+
+class _AsyncTraversal:
+    """
+    State shared by all directory visits of one async scan.
+
+    A fixed pool of worker tasks pulls directories from a LIFO frontier, so
+    in-flight work is bounded globally by the pool size, and the traversal
+    stays depth-first: only folders on the active paths wait for their
+    subdirectories. A folder is assembled as soon as its last subdirectory
+    result arrives, and its own result is then passed up to its parent.
+    """
+
+    def __init__(self, executor, limiter, reader, ignore_types, ignore_patterns,
+                 enable_repo, repo_show_files, repo_records, show_sizes):
+        self.executor = executor
+        self.limiter = limiter
+        self.reader = reader
+        self.ignore_types = ignore_types
+        self.ignore_patterns = ignore_patterns
+        self.enable_repo = enable_repo
+        self.repo_show_files = repo_show_files
+        self.repo_records = repo_records
+        self.show_sizes = show_sizes
+        # Entries: (path, current_indent, inside_repo, parent folder, index in parent's plan)
+        self.frontier = asyncio.LifoQueue()
+        self.done = asyncio.get_running_loop().create_future()
+
+    async def run(self, source_dir, workers):
+        """Scan source_dir with a pool of workers and return its result."""
+        self.frontier.put_nowait((source_dir, 0, False, None, 0))
+        tasks = [asyncio.create_task(self._worker()) for _ in range(workers)]
+        try:
+            return await self.done
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _worker(self):
+        while True:
+            entry = await self.frontier.get()
+            try:
+                await self._visit(*entry)
+            except Exception as error:
+                # Fail the whole scan, as the serial backend would
+                if not self.done.done():
+                    self.done.set_exception(error)
+                return
+
+    async def _visit(self, path, current_indent, inside_repo, parent, slot):
+        """Async counterpart of process_directory for one directory."""
+        # Skip hidden directories if IGNORE_HIDDEN is set
+        if IGNORE_HIDDEN and os.path.basename(path).startswith('.'):
+            self._deliver(parent, slot, ([], [], {"ignored_hidden": 1}))
+            return
+
+        listing = await self.limiter.run(self.executor, self.reader, path, self.ignore_types,
+                                         self.enable_repo, self.show_sizes,
+                                         within_scan_depth(current_indent))
+        plan = plan_subdirectories(listing, self.ignore_patterns, self.enable_repo, inside_repo)
+        folder = {
+            'path': path, 'listing': listing, 'plan': plan, 'indent': current_indent,
+            'inside_repo': inside_repo, 'results': [None] * len(plan), 'remaining': len(plan),
+            'parent': parent, 'slot': slot,
+        }
+        if not plan:
+            self._deliver(parent, slot, self._assemble(folder))
+            return
+
+        # Pushed in reverse so the first subdirectory is read first
+        for i in range(len(plan) - 1, -1, -1):
+            _, sub_path, _, _, child_inside_repo = plan[i]
+            self.frontier.put_nowait((sub_path, current_indent + 1, child_inside_repo, folder, i))
+
+    def _assemble(self, folder):
+        return assemble_directory(folder['path'], folder['listing'], folder['plan'], folder['results'],
+                                  folder['indent'], self.enable_repo, folder['inside_repo'],
+                                  self.repo_show_files, self.repo_records, self.show_sizes)
+
+    def _deliver(self, parent, slot, result):
+        """Store a result in its parent, assembling every folder this completes."""
+        while parent is not None:
+            parent['results'][slot] = result
+            parent['remaining'] -= 1
+            if parent['remaining']:
+                return
+            result = self._assemble(parent)
+            parent, slot = parent['parent'], parent['slot']
+        self.done.set_result(result)
+
+
+def process_directory_async(source_dir, ignore_types, ignore_patterns, enable_repo=False,
+                            repo_show_files=False, repo_records=None, show_sizes=False,
+                            reader=read_directory, limiter_stats=None):
+    """
+    Scan a directory tree with the async backend.
+
+    Takes the same options as process_directory and returns the same
+    (lines, flat_lines, stats). The reader argument allows swapping the
+    directory reader, e.g. for a latency-injecting stand-in
+    (trimmer.latency). If limiter_stats is a dict, it receives the final and
+    peak concurrency limits and the best latency observed.
+    """
+    with ThreadPoolExecutor(max_workers=ASYNC_MAX_CONCURRENCY) as executor:
+        async def main():
+            # The traversal's queue and future must be created inside the running loop
+            limiter = AdaptiveLimiter(ASYNC_MIN_CONCURRENCY, ASYNC_MAX_CONCURRENCY,
+                                      ASYNC_LATENCY_TOLERANCE, ASYNC_LATENCY_FLOOR)
+            traversal = _AsyncTraversal(executor, limiter, reader, ignore_types, ignore_patterns,
+                                        enable_repo, repo_show_files, repo_records, show_sizes)
+            result = await traversal.run(source_dir, ASYNC_MAX_CONCURRENCY)
+            if limiter_stats is not None:
+                limiter_stats.update({
+                    'final_limit': int(limiter.limit),
+                    'peak_limit': int(limiter.peak_limit),
+                    'best_latency': limiter.best_latency,
+                })
+            return result
+
+        return asyncio.run(main())
@@ -2,9 +2,32 @@
 File-specific utilities for handling file types, aliases, and filtering.
 """
 import os
+import time
+import tarfile
 import zipfile
 import xattr
-from config.config import ICON_ELIMINATION, IGNORE_HIDDEN, REPO_TYPES  # Add IGNORE_HIDDEN here
+from config.config import (
+    ICON_ELIMINATION,
+    IGNORE_HIDDEN,
+    REPO_TYPES,
+    ARCHIVE_SCAN_MAX_BYTES,
+    ARCHIVE_SCAN_TIMEOUT,
+)
+
+# Archive formats checked for repositories, with the tarfile mode used to read them.
+# Plain tars are opened seekable so only member headers are read; compressed
+# tars are read as a stream, since member data must be decompressed to reach
+# the next header.
+ZIP_EXTENSIONS = ('.zip',)
+TAR_MODES = {
+    '.tar': 'r:',
+    '.tar.gz': 'r|gz',
+    '.tgz': 'r|gz',
+    '.tar.bz2': 'r|bz2',
+    '.tbz2': 'r|bz2',
+    '.tar.xz': 'r|xz',
+    '.txz': 'r|xz',
+}
 
 def is_alias(filepath):
     """
@@ -73,16 +96,114 @@ def is_repo(dirpath):
 
     return False, None
 
+def _tar_mode(filename):
+    """Return the tarfile read mode for a tar-family archive name, or None."""
+    lower_name = filename.lower()
+    for ext, mode in TAR_MODES.items():
+        if lower_name.endswith(ext):
+            return mode
+    return None
+
+
+def is_archive_name(filename):
+    """Check if a filename has an archive extension scanned in repo mode."""
+    return filename.lower().endswith(ZIP_EXTENSIONS) or _tar_mode(filename) is not None
+
+
+def repo_archive_suffix(filename):
+    """
+    Return the display suffix for an archive that contains a repository.
+
+    Zip archives are marked with .repo.zip and tar-family archives with .repo.tar.
+    """
+    return '.repo.tar' if _tar_mode(filename) else '.repo.zip'
+
+
+class _ScanBudgetExceeded(Exception):
+    """Raised when an archive scan runs past its byte or time budget."""
+
+
+class _BudgetedReader:
+    """
+    File wrapper that stops reading once a byte or time budget is used up.
+
+    Only bytes actually read count against the budget; seeking over member
+    data in an uncompressed tar is free.
+    """
+
+    def __init__(self, fileobj, max_bytes, deadline):
+        self._fileobj = fileobj
+        self._remaining = max_bytes
+        self._deadline = deadline
+
+    def read(self, size=-1):
+        if time.monotonic() > self._deadline:
+            raise _ScanBudgetExceeded()
+        data = self._fileobj.read(size)
+        self._remaining -= len(data)
+        if self._remaining < 0:
+            raise _ScanBudgetExceeded()
+        return data
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        return self._fileobj.seek(offset, whence)
+
+    def tell(self):
+        return self._fileobj.tell()
+
+
+def _scan_tar_archive(filepath, mode):
+    """
+    Stream tar member headers until the first repository marker is found.
+
+    Returns:
+        tuple: (is_repo_archive, repo_type); (False, None) when no marker is
+        found within ARCHIVE_SCAN_MAX_BYTES / ARCHIVE_SCAN_TIMEOUT
+    """
+    # Marker name -> repo type, keeping REPO_TYPES order for duplicates
+    marker_types = {}
+    for repo_type, markers in REPO_TYPES.items():
+        for marker in markers:
+            marker_types.setdefault(marker, repo_type)
+
+    deadline = time.monotonic() + ARCHIVE_SCAN_TIMEOUT
+    try:
+        with open(filepath, 'rb') as raw:
+            reader = _BudgetedReader(raw, ARCHIVE_SCAN_MAX_BYTES, deadline)
+            with tarfile.open(fileobj=reader, mode=mode) as tf:
+                # next() reads one header at a time, so we can stop at the first marker
+                member = tf.next()
+                while member is not None:
+                    for part in member.name.split('/'):
+                        if part in marker_types:
+                            return True, marker_types[part]
+                    if time.monotonic() > deadline:
+                        return False, None
+                    member = tf.next()
+        return False, None
+
+    except _ScanBudgetExceeded:
+        # Too large or too slow to inspect within budget
+        return False, None
+    except tarfile.TarError:
+        # Not a valid tar, or corrupted compressed data
+        return False, None
+    except (OSError, EOFError):
+        # File access error or truncated archive
+        return False, None
+
+
 def is_repo_archive(filepath):
     """
-    Check if a zip archive contains a repository by scanning for repo markers.
+    Check if an archive contains a repository by scanning for repo markers.
 
-    This function inspects the contents of a zip archive without extracting files,
-    looking for version control system markers (e.g., .git, .hg, .svn) that indicate
-    the archive contains a repository.
+    This function inspects the contents of a zip or tar-family archive
+    (.tar, .tar.gz, .tgz, .tar.bz2, .tbz2, .tar.xz, .txz) without extracting
+    files, looking for version control system markers (e.g., .git, .hg, .svn)
+    that indicate the archive contains a repository.
 
     Args:
-        filepath: Absolute path to potential zip archive file
+        filepath: Absolute path to potential archive file
 
     Returns:
         tuple: (is_repo_archive, repo_type)
@@ -97,13 +218,21 @@ def is_repo_archive(filepath):
         (False, None)
 
     Notes:
-        - Only reads archive metadata (namelist), does not extract files
-        - Checks for markers at root level or within first-level folders
-        - Returns (False, None) for corrupted zips or permission errors
+        - Zips: only reads archive metadata (namelist), does not extract files
+        - Tars: reads member headers in order and stops at the first marker;
+          gives up after ARCHIVE_SCAN_MAX_BYTES bytes or ARCHIVE_SCAN_TIMEOUT
+          seconds so very large archives cannot stall the scan
+        - Checks for markers at any depth inside the archive
+        - Returns (False, None) for corrupted archives or permission errors
         - Uses REPO_TYPES config for marker definitions
     """
+    # Tar-family archives are scanned header by header
+    mode = _tar_mode(filepath)
+    if mode is not None:
+        return _scan_tar_archive(filepath, mode)
+
     # Validate file extension - quick filter before attempting zip operations
-    if not filepath.lower().endswith('.zip'):
+    if not filepath.lower().endswith(ZIP_EXTENSIONS):
         return False, None
 
     try:
@@ -3,11 +3,14 @@ File system utilities for directory traversal and path manipulation.
 Focused on directory structure generation.
 """
 import os
-from config.config import COLLAPSE_CHAINS, MAX_FILES_DISPLAY, IGNORE_HIDDEN, MAX_SCAN_DEPTH, REPO_TYPES
+from collections import Counter
+from config.config import COLLAPSE_CHAINS, MAX_FILES_DISPLAY, IGNORE_HIDDEN, MAX_SCAN_DEPTH, REPO_TYPES, FOLDER_SIZE_MIN_BYTES, OMITTED_TYPES_TOP_K
 
 # Import functionality from other modules
 from .sorting import finder_sort_key
-from .files import is_alias, is_ignored_file, is_repo, is_repo_archive
+from .files import is_alias, is_ignored_file, is_repo, is_repo_archive, is_archive_name, repo_archive_suffix
+from .repo_index import make_repo_record
+from .formatter import format_rollup, format_type_histogram
 
 def collapse_dirs(path, ignore_types, chain_so_far=None):
     """Collapse chains of single-folder directories."""
@@ -56,108 +59,231 @@ def collapse_dirs(path, ignore_types, chain_so_far=None):
     return collapsed, path
 
 
-def process_directory(path, ignore_types, ignore_patterns, current_indent=0, parent_path="", enable_repo=False, inside_repo=False, repo_show_files=False):
-    """Process a directory and return formatted lines for tree output."""
-    # Get the directory name
-    basename = os.path.basename(path)
-    
-    # Skip hidden directories if IGNORE_HIDDEN is set
-    if IGNORE_HIDDEN and basename.startswith('.'):
-        return [], [], {"ignored_hidden": 1}
-    
-    lines = []
-    flat_lines = []
-    norm_path = os.path.normpath(path)
-    
-    # Update raw folder count
-    stats = {"raw_total_folders": 1}
-    
+def merge_stats(stats, sub_stats):
+    """
+    Add a subdirectory's stats into its parent's.
+
+    Counts are summed, the newest mtime is a max, and Counter values (e.g.
+    omitted file types) are added key by key.
+    """
+    for key, value in sub_stats.items():
+        if key == 'newest_mtime':
+            stats[key] = max(stats.get(key, 0), value)
+        elif isinstance(value, Counter):
+            stats.setdefault(key, Counter()).update(value)
+        else:
+            stats[key] = stats.get(key, 0) + value
+
+
+def _annotate_folder(lines, flat_lines, line_index, flat_index, folder_stats):
+    """
+    Append a du-style rollup to a folder's tree and flat lines.
+
+    Folders below FOLDER_SIZE_MIN_BYTES are left unannotated. Totals are
+    marked as lower bounds when part of the subtree was not scanned.
+    """
+    total_bytes = folder_stats.get('rollup_bytes', 0)
+    if total_bytes < FOLDER_SIZE_MIN_BYTES:
+        return
+    rollup = format_rollup(total_bytes, folder_stats.get('raw_total_files', 0),
+                           folder_stats.get('newest_mtime'), folder_stats.get('rollup_partial', 0) > 0)
+    # Keep the trailing slash last so the line still reads as a folder
+    lines[line_index] = f"{lines[line_index][:-1]} {rollup}/"
+    flat_lines[flat_index] = f"{flat_lines[flat_index]} {rollup}"
+
+
+def within_scan_depth(current_indent):
+    """Check if subdirectories at this level should still be scanned."""
+    return MAX_SCAN_DEPTH == 0 or current_indent < MAX_SCAN_DEPTH
+
+
+def read_directory(path, ignore_types, enable_repo=False, show_sizes=False, list_subdirs=True):
+    """
+    Read everything needed to process one directory from the file system.
+
+    This is the only blocking part of the traversal (chain collapsing,
+    scandir, stat, xattr and archive/repo checks). The listing it returns is
+    turned into output by assemble_directory, which every traversal backend
+    shares, so backends only differ in how they schedule these reads.
+
+    Returns:
+        Dictionary with:
+            path: Directory actually listed (end of a collapsed chain)
+            collapsed_label: Label for a collapsed chain, or None
+            files: (name, kind, detail) in Finder order, where kind is
+                'ignored' (detail = reason), 'repo_archive' (detail = repo
+                index record or None), 'alias' or 'regular'
+            subdirs: (name, path, repo_type, repo record) for visible
+                subdirectories in Finder order (repo_type None if not a repo)
+            total_bytes, newest_mtime: File size/mtime totals (show_sizes)
+            partial: True if subdirectories were left out (hidden, beyond
+                MAX_SCAN_DEPTH) or the directory could not be read
+    """
+    listing = {'path': path, 'collapsed_label': None, 'files': [], 'subdirs': [],
+               'total_bytes': 0, 'newest_mtime': 0, 'partial': False}
+
     # Process collapsing if enabled.
     if COLLAPSE_CHAINS:
         collapsed_label, final_dir = collapse_dirs(path, ignore_types)
-        indent = '  ' * current_indent
-        if os.path.normpath(final_dir) != norm_path:
-            lines.append(f"{indent}{collapsed_label}/")
-            flat_lines.append(os.path.normpath(final_dir) + '/')
-            path = final_dir  # Continue from the collapsed end.
-        else:
-            if not inside_repo:
-                folder_name = os.path.basename(path)
-                lines.append(f"{indent}{folder_name}/")
-                flat_lines.append(norm_path + '/')
-    else:
-        indent = '  ' * current_indent
-        if not inside_repo:
-            folder_name = os.path.basename(path)
-            lines.append(f"{indent}{folder_name}/")
-            flat_lines.append(norm_path + '/')
+        if os.path.normpath(final_dir) != os.path.normpath(path):
+            listing['collapsed_label'] = collapsed_label
+            listing['path'] = path = final_dir  # Continue from the collapsed end.
 
-    # Process files in this directory.
+    # Entries are sorted once here; every list derived from them (files,
+    # aliases, subdirectories) keeps this order, so neither the assembly nor
+    # the formatter needs to sort again.
     try:
-        entries = sorted(os.listdir(path), key=finder_sort_key)
+        entries = sorted(os.scandir(path), key=lambda e: finder_sort_key(e.name))
     except PermissionError:
         entries = []
+        listing['partial'] = True
 
-    # Create separate lists for regular files, aliases, and repo archives
-    regular_files = []
-    alias_files = []
-    repo_archive_files = []
-
-    for entry in entries:
-        full_entry = os.path.join(path, entry)
-        if os.path.isfile(full_entry):
-            stats['raw_total_files'] = stats.get('raw_total_files', 0) + 1
+    for dir_entry in entries:
+        entry = dir_entry.name
+        full_entry = dir_entry.path
+        if dir_entry.is_file():
+            # Size and mtime rollups count every file, including ignored ones
+            if show_sizes:
+                try:
+                    st = dir_entry.stat()
+                    listing['total_bytes'] += st.st_size
+                    listing['newest_mtime'] = max(listing['newest_mtime'], st.st_mtime)
+                except OSError:
+                    pass
 
             # Check if file should be ignored
             should_ignore, ignore_reason = is_ignored_file(entry, ignore_types)
             if should_ignore:
-                if ignore_reason == "icon":
-                    stats['ignored_icons'] = stats.get('ignored_icons', 0) + 1
-                elif ignore_reason == "type":
-                    stats['ignored_by_type'] = stats.get('ignored_by_type', 0) + 1
+                listing['files'].append((entry, 'ignored', ignore_reason))
                 continue
 
             # Check for repo archives when repo detection is enabled
             # This happens BEFORE alias detection to prioritize repo status
-            if enable_repo and entry.lower().endswith('.zip'):
+            if enable_repo and is_archive_name(entry):
                 is_archive, repo_type = is_repo_archive(full_entry)
                 if is_archive:
-                    # Mark as repo archive with .repo.zip suffix
-                    repo_archive_name = entry + ".repo.zip"
-                    repo_archive_files.append(repo_archive_name)
-
-                    # Update statistics
-                    stats['repo_archives_detected'] = stats.get('repo_archives_detected', 0) + 1
-
-                    # Skip further processing (don't check as alias or regular file)
+                    record = make_repo_record(full_entry, repo_type, 'archive', False)
+                    listing['files'].append((entry, 'repo_archive', record))
                     continue
 
             # Check if the file is a macOS alias
-            if is_alias(full_entry):
-                alias_name = entry + ".alias"
-                alias_files.append(alias_name)
-                # Count detected aliases in our stats
-                stats['detected_aliases'] = stats.get('detected_aliases', 0) + 1
-            else:
-                # Regular non-alias file
-                regular_files.append(entry)
-    
-    # Always display all aliases (they're important navigation elements)
-    for alias in alias_files:
-        lines.append(f"{indent}  {alias}")
-        # For flat_lines, we don't want to add the .alias suffix
-        original_name = alias.replace('.alias', '')
-        flat_lines.append(os.path.normpath(os.path.join(path, original_name)))
-        stats['filtered_total_files'] = stats.get('filtered_total_files', 0) + 1
+            kind = 'alias' if is_alias(full_entry) else 'regular'
+            listing['files'].append((entry, kind, None))
 
-    # Always display all repo archives (like aliases, they're important markers)
-    # Only shown when enable_repo=True (controlled by --repo flag)
-    for repo_archive in repo_archive_files:
-        lines.append(f"{indent}  {repo_archive}")
-        # For flat_lines, strip the .repo.zip suffix to show original filename
-        original_name = repo_archive.replace('.repo.zip', '')
-        flat_lines.append(os.path.normpath(os.path.join(path, original_name)))
-        stats['filtered_total_files'] = stats.get('filtered_total_files', 0) + 1
+        elif dir_entry.is_dir():
+            if not list_subdirs or (IGNORE_HIDDEN and entry.startswith('.')):
+                listing['partial'] = True
+                continue
+            repo_type = record = None
+            if enable_repo:
+                is_repository, repo_type = is_repo(full_entry)
+                if is_repository:
+                    record = make_repo_record(full_entry, repo_type, 'directory', False)
+            listing['subdirs'].append((entry, full_entry, repo_type, record))
+
+    return listing
+
+
+def plan_subdirectories(listing, ignore_patterns, enable_repo, inside_repo):
+    """
+    Choose the subdirectories to recurse into, in output order.
+
+    Returns:
+        List of (name, path, repo_type, repo record, child_inside_repo)
+    """
+    plan = []
+    for sub, sub_path, repo_type, record in listing['subdirs']:
+        # Repositories are always entered (to find nested repos)
+        if enable_repo and repo_type:
+            plan.append((sub, sub_path, repo_type, record, True))
+            continue
+
+        # Not a repo (or repo detection disabled), check ignore patterns
+        if any(pattern in sub for pattern in ignore_patterns):
+            continue  # Skip this directory
+
+        plan.append((sub, sub_path, None, None, inside_repo))
+    return plan
+
+
+def _record_repo(repo_records, record, nested):
+    """Append a repo index record when the caller is collecting them."""
+    if repo_records is None or record is None:
+        return
+    repo_records.append(dict(record, nested=nested))
+
+
+def assemble_directory(path, listing, plan, child_results, current_indent=0, enable_repo=False, inside_repo=False, repo_show_files=False, repo_records=None, show_sizes=False):
+    """
+    Turn a directory listing and its children's results into output.
+
+    Pure function of its inputs (no file system access), shared by the
+    serial and async traversal backends so both produce identical output.
+
+    Args:
+        path: Directory path as requested (before chain collapsing)
+        listing: Result of read_directory
+        plan: Result of plan_subdirectories
+        child_results: (lines, flat_lines, stats) for each plan entry, in order
+
+    Returns:
+        Tuple of (lines, flat_lines, stats)
+    """
+    lines = []
+    flat_lines = []
+    norm_path = os.path.normpath(path)
+    indent = '  ' * current_indent
+
+    # Update raw folder count
+    stats = {"raw_total_folders": 1}
+
+    if listing['collapsed_label'] is not None:
+        lines.append(f"{indent}{listing['collapsed_label']}/")
+        flat_lines.append(os.path.normpath(listing['path']) + '/')
+    elif not inside_repo:
+        folder_name = os.path.basename(path)
+        lines.append(f"{indent}{folder_name}/")
+        flat_lines.append(norm_path + '/')
+    path = listing['path']
+
+    # Index of this folder's own line, annotated once the subtree is rolled up
+    # (inside a repo the parent emits and annotates the line instead)
+    own_line = 0 if lines else None
+
+    if show_sizes:
+        stats['rollup_bytes'] = listing['total_bytes']
+        if listing['newest_mtime']:
+            stats['newest_mtime'] = listing['newest_mtime']
+        # Skipped subtrees (hidden, too deep, pattern-ignored) make totals lower bounds
+        if listing['partial'] or len(plan) < len(listing['subdirs']):
+            stats['rollup_partial'] = 1
+
+    # Visible files in Finder order as (entry, display_name, always_shown).
+    # Aliases and repo archives are always shown; regular files follow the limit.
+    visible_files = []
+    regular_count = 0
+
+    for entry, kind, detail in listing['files']:
+        stats['raw_total_files'] = stats.get('raw_total_files', 0) + 1
+
+        if kind == 'ignored':
+            if detail == "icon":
+                stats['ignored_icons'] = stats.get('ignored_icons', 0) + 1
+            elif detail == "type":
+                stats['ignored_by_type'] = stats.get('ignored_by_type', 0) + 1
+        elif kind == 'repo_archive':
+            # Mark as repo archive with .repo.zip / .repo.tar suffix
+            visible_files.append((entry, entry + repo_archive_suffix(entry), True))
+            stats['repo_archives_detected'] = stats.get('repo_archives_detected', 0) + 1
+            _record_repo(repo_records, detail, inside_repo)
+        elif kind == 'alias':
+            visible_files.append((entry, entry + ".alias", True))
+            # Count detected aliases in our stats
+            stats['detected_aliases'] = stats.get('detected_aliases', 0) + 1
+        else:
+            # Regular non-alias file
+            visible_files.append((entry, entry, False))
+            regular_count += 1
 
     # Determine effective file display limit
     if enable_repo and not repo_show_files:
@@ -168,57 +294,91 @@ def process_directory(path, ignore_types, ignore_patterns, current_indent=0, par
         effective_max_files = MAX_FILES_DISPLAY
 
     # Apply file display logic using effective limit
-    if effective_max_files == 0:
-        # Folders-only mode: skip regular files
-        pass
-    elif len(regular_files) > effective_max_files:
-        # Show summary for regular files if they exceed the limit
-        lines.append(f"{indent}  [omitted {len(regular_files)} files]")
-        stats['filtered_total_files'] = stats.get('filtered_total_files', 0) + len(regular_files)
-    else:
-        # Show all regular files if under the limit
-        for entry in regular_files:
-            lines.append(f"{indent}  {entry}")
-            flat_lines.append(os.path.normpath(os.path.join(path, entry)))
-            stats['filtered_total_files'] = stats.get('filtered_total_files', 0) + 1
-
-    # Process subdirectories - ADD DEPTH CHECK HERE
-    if MAX_SCAN_DEPTH == 0 or current_indent < MAX_SCAN_DEPTH:
-        try:
-            subdirs = sorted([d for d in entries if os.path.isdir(os.path.join(path, d)) and 
-                             not (IGNORE_HIDDEN and d.startswith('.'))], 
-                             key=finder_sort_key)
-        except PermissionError:
-            subdirs = []
-        for sub in subdirs:
-            sub_path = os.path.join(path, sub)
-            
-            # Check if repo detection is enabled and this is a repository
-            if enable_repo:
-                is_repository, repo_type = is_repo(sub_path)
-                if is_repository:
-                    # Mark as repository and continue recursing to find nested repos
-                    repo_name = f"{sub}.repo"
-                    lines.append(f"{indent}  {repo_name}/")
-                    flat_lines.append(os.path.normpath(sub_path) + '/')
-                    stats['repos_detected'] = stats.get('repos_detected', 0) + 1
-                    
-                    # Recurse into the repo to detect nested repos, with inside_repo=True
-                    sub_lines, sub_flat, sub_stats = process_directory(sub_path, ignore_types, ignore_patterns, current_indent + 1, path, enable_repo, inside_repo=True, repo_show_files=repo_show_files)
-                    lines.extend(sub_lines)
-                    flat_lines.extend(sub_flat)
-                    for key, value in sub_stats.items():
-                        stats[key] = stats.get(key, 0) + value
-                    continue
-            
-            # Not a repo (or repo detection disabled), check ignore patterns
-            if any(pattern in sub for pattern in ignore_patterns):
-                continue  # Skip this directory
-            
-            # Recurse normally
-            sub_lines, sub_flat, sub_stats = process_directory(sub_path, ignore_types, ignore_patterns, current_indent + 1, path, enable_repo, inside_repo, repo_show_files)
+    show_regular = 0 < effective_max_files and regular_count <= effective_max_files
+    if effective_max_files and regular_count > effective_max_files:
+        # Show summary for regular files if they exceed the limit, with the
+        # most common extensions so no second file-listing pass is needed
+        omitted_types = Counter(os.path.splitext(entry)[1].lower() or "(no ext)"
+                                for entry, _, always_shown in visible_files if not always_shown)
+        if OMITTED_TYPES_TOP_K:
+            histogram = format_type_histogram(omitted_types, OMITTED_TYPES_TOP_K)
+            lines.append(f"{indent}  [omitted {regular_count:,} files: {histogram}]")
+        else:
+            lines.append(f"{indent}  [omitted {regular_count:,} files]")
+        stats['filtered_total_files'] = stats.get('filtered_total_files', 0) + regular_count
+        stats['omitted_types'] = omitted_types
+
+    # Aliases and repo archives are always displayed (important navigation
+    # elements and markers); regular files only when under the limit.
+    for entry, display_name, always_shown in visible_files:
+        if not (always_shown or show_regular):
+            continue
+        lines.append(f"{indent}  {display_name}")
+        # For flat_lines, use the original filename without display suffixes
+        flat_lines.append(os.path.normpath(os.path.join(path, entry)))
+        stats['filtered_total_files'] = stats.get('filtered_total_files', 0) + 1
+
+    # Subdirectory results, in the planned (Finder) order
+    for (sub, sub_path, repo_type, record, _), (sub_lines, sub_flat, sub_stats) in zip(plan, child_results):
+        if repo_type:
+            # Mark as repository; its contents were scanned with inside_repo=True
+            repo_name = f"{sub}.repo"
+            lines.append(f"{indent}  {repo_name}/")
+            flat_lines.append(os.path.normpath(sub_path) + '/')
+            repo_line, repo_flat = len(lines) - 1, len(flat_lines) - 1
+            stats['repos_detected'] = stats.get('repos_detected', 0) + 1
+            _record_repo(repo_records, record, inside_repo)
+
             lines.extend(sub_lines)
             flat_lines.extend(sub_flat)
-            for key, value in sub_stats.items():
-                stats[key] = stats.get(key, 0) + value
-    return lines, flat_lines, stats
\ No newline at end of file
+            # The repo's own line is emitted here, so annotate it here
+            if show_sizes:
+                _annotate_folder(lines, flat_lines, repo_line, repo_flat, sub_stats)
+        else:
+            lines.extend(sub_lines)
+            flat_lines.extend(sub_flat)
+
+        # Keep per-top-level-folder omitted type summaries at the scan root
+        if current_indent == 0 and 'omitted_types' in sub_stats:
+            stats.setdefault('omitted_by_folder', {})[sub] = sub_stats['omitted_types']
+        merge_stats(stats, sub_stats)
+
+    # Subtree is complete: annotate this folder's line with its rollup
+    if show_sizes and own_line is not None:
+        _annotate_folder(lines, flat_lines, own_line, own_line, stats)
+    return lines, flat_lines, stats
+
+
+def process_directory(path, ignore_types, ignore_patterns, current_indent=0, parent_path="", enable_repo=False, inside_repo=False, repo_show_files=False, repo_records=None, show_sizes=False, reader=read_directory):
+    """
+    Process a directory and return formatted lines for tree output.
+
+    This is the serial traversal backend: each directory is read with
+    read_directory, its subdirectories are processed recursively in order,
+    and assemble_directory builds the output.
+
+    When repo_records is a list, every repository found (directory or
+    archive) is appended to it as a repo index record.
+
+    When show_sizes is set, each folder line is annotated with the total
+    bytes, file count (including ignored and omitted files) and newest file
+    mtime of its scanned subtree, taken from the same scandir pass and rolled
+    up from the subdirectories' stats. Totals of a subtree that was only
+    partly scanned are shown as lower bounds (e.g. "≥12.4 GB").
+
+    The reader argument allows swapping the directory reader, as for the
+    async backend (e.g. trimmer.latency's latency-injecting stand-in).
+    """
+    # Skip hidden directories if IGNORE_HIDDEN is set
+    if IGNORE_HIDDEN and os.path.basename(path).startswith('.'):
+        return [], [], {"ignored_hidden": 1}
+
+    listing = reader(path, ignore_types, enable_repo, show_sizes, within_scan_depth(current_indent))
+    plan = plan_subdirectories(listing, ignore_patterns, enable_repo, inside_repo)
+
+    child_results = []
+    for _, sub_path, _, _, child_inside_repo in plan:
+        child_results.append(process_directory(sub_path, ignore_types, ignore_patterns, current_indent + 1, listing['path'], enable_repo, child_inside_repo, repo_show_files, repo_records, show_sizes, reader))
+
+    return assemble_directory(path, listing, plan, child_results, current_indent, enable_repo, inside_repo,
+                              repo_show_files, repo_records, show_sizes)
@@ -1,8 +1,24 @@
 # formatter.py
-from .sorting import finder_sort_key  # Import the Finder sort key function
+import re
+from datetime import datetime
+
+from .sorting import finder_sort_key
+
+# Matches a rollup appended by format_rollup, e.g. " [12.4 GB, 3k files, 2025-09]"
+ROLLUP_PATTERN = re.compile(r' \[≥?[\d.]+ [KMGT]?B, ≥?[\d.]+[kM]? files?(, \d{4}-\d{2})?\]$')
 
 def format_tree_as_yaml(tree_lines):
-    """Format tree lines as YAML."""
+    """
+    Format tree lines as YAML.
+
+    Tree lines arrive in Finder order (process_directory sorts each directory
+    once with finder_sort_key), and dicts keep insertion order, so folders and
+    files are emitted as they come without re-sorting. The exception is a
+    line indented deeper than its parent allows: subfolders inside a repo emit
+    no line of their own, so their entries merge into an ancestor's listing.
+    Folders that receive such merged entries (and folders created below them)
+    are sorted again, using the cached sort keys.
+    """
     yaml_header = [
         "# This YAML represents a trimmed, structured export of a macOS file system folder.",
         "# Files may be omitted due to TreeTrimmer config settings (e.g., MAX_FILES_DISPLAY = 0, ignored file types).",
@@ -13,6 +29,8 @@ def format_tree_as_yaml(tree_lines):
     # Build a directory structure with folders and files
     structure = {}
     current_path = []
+    # ids of folder dicts whose entries come from more than one directory
+    merged = set()
     
     for line in tree_lines:
         stripped = line.lstrip()
@@ -21,6 +39,7 @@ def format_tree_as_yaml(tree_lines):
         
         # Adjust current path based on indentation level
         current_path = current_path[:level]
+        skipped_level = len(current_path) < level
         
         # Determine if it's a folder or file
         is_folder = stripped.endswith('/')
@@ -37,10 +56,15 @@ def format_tree_as_yaml(tree_lines):
                 pos[path_part] = {}
                 pos = pos[path_part]
         
+        if skipped_level:
+            merged.add(id(pos))
+
         # Add the new item
         if is_folder:
             if item_name not in pos:
                 pos[item_name] = {}
+                if id(pos) in merged:
+                    merged.add(id(pos[item_name]))
             current_path.append(item_name)
         else:
             if not isinstance(pos.get("files"), list):
@@ -59,8 +83,12 @@ def format_tree_as_yaml(tree_lines):
             else:
                 files = None
                 
-            # Process folders first - USE FINDER SORT ORDER
-            items = sorted(obj.items(), key=lambda x: finder_sort_key(x[0]))
+            # Process folders first - already in Finder sort order unless merged
+            items = obj.items()
+            if id(obj) in merged:
+                items = sorted(items, key=lambda x: finder_sort_key(x[0]))
+                if files:
+                    files = sorted(files, key=finder_sort_key)
             for name, contents in items:
                 if contents:
                     yaml_lines.append(f"{indent}{prefix}{name}:")
@@ -68,10 +96,10 @@ def format_tree_as_yaml(tree_lines):
                 else:
                     yaml_lines.append(f"{indent}{prefix}{name}: {{}}")
             
-            # Add files as a list under the current level - USE FINDER SORT ORDER
+            # Add files as a list under the current level - already in Finder sort order
             if files:
                 yaml_lines.append(f"{indent}files:")
-                for file in sorted(files, key=finder_sort_key):
+                for file in files:
                     yaml_lines.append(f"{indent}  - {file}")
     
     # Start with the root folder
@@ -82,6 +110,64 @@ def format_tree_as_yaml(tree_lines):
     
     return '\n'.join(yaml_header + yaml_lines)
 
+def _format_size(num_bytes):
+    """Human-readable size in binary units, du -h style (e.g. 12.4 GB)."""
+    size = float(num_bytes)
+    for unit in ("B", "KB", "MB", "GB"):
+        # Compare the rounded value so 1023.96 KB shows as 1.0 MB, not 1024.0 KB
+        if round(size, 1) < 1024:
+            return f"{int(size)} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+def _format_count(count):
+    """Compact count: 950, 3.4k, 12k, 1.2M."""
+    if count < 1000:
+        return str(count)
+    for divisor, suffix in ((1000, "k"), (1000000, "M")):
+        value = count / divisor
+        text = f"{value:.1f}" if value < 9.95 else f"{value:.0f}"
+        # Carry over when rounding reaches the next unit (999,600 is 1M, not 1000k)
+        if float(text) < 1000 or suffix == "M":
+            return text.replace(".0", "") + suffix
+
+
+def format_rollup(total_bytes, file_count, newest_mtime=None, partial=False):
+    """
+    Format a folder rollup for display next to its name.
+
+    Example: "[12.4 GB, 3k files, 2025-09]" (month of the newest file; left
+    out when the subtree has no files). With partial set (part of the
+    subtree was not scanned), totals are lower bounds: "[≥12.4 GB, ≥3k files]".
+    """
+    bound = "≥" if partial else ""
+    parts = [f"{bound}{_format_size(total_bytes)}",
+             f"{bound}{_format_count(file_count)} file{'' if file_count == 1 else 's'}"]
+    if newest_mtime:
+        parts.append(datetime.fromtimestamp(newest_mtime).strftime("%Y-%m"))
+    return f"[{', '.join(parts)}]"
+
+
+def format_type_histogram(type_counts, top_k):
+    """
+    Format file extension counts, most common first, e.g. "3,900 .jpg, 280 .pdf, 30 other".
+
+    Only the top_k extensions are named; the rest are summed into "other".
+    """
+    ranked = sorted(type_counts.items(), key=lambda item: (-item[1], item[0]))
+    parts = [f"{count:,} {ext}" for ext, count in ranked[:top_k]]
+    other = sum(count for _, count in ranked[top_k:])
+    if other:
+        parts.append(f"{other:,} other")
+    return ", ".join(parts)
+
+
+def strip_rollup(label):
+    """Remove a rollup annotation from a folder label, if present."""
+    return ROLLUP_PATTERN.sub('', label)
+
+
 def format_tree_output(tree_lines):
     """Converts a list of tree-format lines into a YAML string."""
     return format_tree_as_yaml(tree_lines)
@@ -0,0 +1,170 @@
+"""
+Latency-injecting file system stand-in for exercising the async backend.
+
+LatencyInjectingReader wraps read_directory and sleeps before each read,
+modelling a remote mount: a base round-trip latency, optional jitter, and a
+server that only handles `capacity` reads at once (beyond that, latency
+grows with the queue). The data still comes from the local disk, so a
+scan through the stand-in must produce exactly the serial backend's output.
+
+Run as a module to compare backends on a local directory (or, without a
+directory, on a generated sample tree). With --check it exits with an error
+unless the async backend matches the serial output and is not slower:
+
+    python -m trimmer.latency /path/to/dir --latency-ms 20 --capacity 16
+    python -m trimmer.latency --check --latency-ms 5 --capacity 16
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import threading
+
+from .filesystem import read_directory, process_directory
+
+
+class LatencyInjectingReader:
+    """
+    Directory reader that adds simulated mount latency to read_directory.
+
+    Args:
+        latency: Base seconds added to every directory read
+        jitter: Extra random seconds, uniform in [0, jitter]
+        capacity: Reads served concurrently before queueing (0 = unlimited)
+    """
+
+    def __init__(self, latency=0.02, jitter=0.0, capacity=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.capacity = capacity
+        self.calls = 0
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, path, *args):
+        with self._lock:
+            self._in_flight += 1
+            self.calls += 1
+            self.max_in_flight = max(self.max_in_flight, self._in_flight)
+            in_flight = self._in_flight
+        try:
+            delay = self.latency + random.uniform(0, self.jitter)
+            if self.capacity and in_flight > self.capacity:
+                # Overloaded server: requests beyond capacity wait their turn
+                delay *= in_flight / self.capacity
+            time.sleep(delay)
+            return read_directory(path, *args)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+
+def compare_backends(source_dir, reader, ignore_types=(), ignore_patterns=(), **options):
+    """
+    Scan source_dir with the serial and the async backend, both via reader.
+
+    Returns:
+        Dictionary with 'match' (True if lines, flat lines and stats are
+        identical), timings, reads per pass and the async limiter stats
+    """
+    # Imported here: async_scan is only needed when comparing
+    from .async_scan import process_directory_async
+
+    ignore_types, ignore_patterns = list(ignore_types), list(ignore_patterns)
+
+    start = time.monotonic()
+    serial = process_directory(source_dir, ignore_types, ignore_patterns, reader=reader, **options)
+    serial_time = time.monotonic() - start
+    serial_reads = reader.calls
+
+    limiter_stats = {}
+    reader.max_in_flight = 0
+    start = time.monotonic()
+    concurrent = process_directory_async(source_dir, ignore_types, ignore_patterns, reader=reader,
+                                         limiter_stats=limiter_stats, **options)
+    async_time = time.monotonic() - start
+
+    return {
+        'match': serial == concurrent,
+        'serial_seconds': serial_time,
+        'async_seconds': async_time,
+        'serial_reads': serial_reads,
+        'async_reads': reader.calls - serial_reads,
+        'limiter': limiter_stats,
+    }
+
+
+def check_backends(source_dir, reader, **options):
+    """
+    Check that the async backend matches the serial output and is not slower.
+
+    Both backends read through the same latency-injecting reader, so this
+    checks the case the async backend exists for.
+
+    Returns:
+        Tuple of (result, failures): the compare_backends result and a list
+        of failure messages (empty if the check passed)
+    """
+    result = compare_backends(source_dir, reader, **options)
+    failures = []
+    if not result['match']:
+        failures.append("async output differs from the serial backend")
+    if result['async_seconds'] > result['serial_seconds']:
+        failures.append(f"async scan took {result['async_seconds']:.2f}s, "
+                        f"serial scan {result['serial_seconds']:.2f}s under the same latency")
+    return result, failures
+
+
+def build_sample_tree(root, width=12, depth=2, files=3):
+    """Create a tree of width**depth leaf folders with a few files each, for checks."""
+    def build(path, level):
+        os.makedirs(path, exist_ok=True)
+        for i in range(files):
+            with open(os.path.join(path, f"file{i}.txt"), 'w') as f:
+                f.write("x" * (i + 1))
+        if level < depth:
+            for i in range(width):
+                build(os.path.join(path, f"dir{i}"), level + 1)
+    build(root, 0)
+    return root
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare serial and async traversal under simulated latency.")
+    parser.add_argument('source_dir', nargs='?',
+                        help="Folder to scan (default: a generated sample tree)")
+    parser.add_argument('--latency-ms', type=float, default=20.0, help="Base latency per directory read")
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help="Random extra latency per read")
+    parser.add_argument('--capacity', type=int, default=0, help="Concurrent reads before the mount slows down (0 = unlimited)")
+    parser.add_argument('--repo', action='store_true', help="Enable repository detection")
+    parser.add_argument('--sizes', action='store_true', help="Enable size rollups")
+    parser.add_argument('--check', action='store_true',
+                        help="Exit with an error unless async output matches and async is not slower")
+    args = parser.parse_args()
+
+    reader = LatencyInjectingReader(args.latency_ms / 1000, args.jitter_ms / 1000, args.capacity)
+    options = {'enable_repo': args.repo, 'show_sizes': args.sizes}
+
+    with tempfile.TemporaryDirectory() as sample_dir:
+        source_dir = args.source_dir or build_sample_tree(os.path.join(sample_dir, "sample"))
+        failures = []
+        if args.check:
+            result, failures = check_backends(source_dir, reader, **options)
+        else:
+            result = compare_backends(source_dir, reader, **options)
+
+    print(f"Output identical: {result['match']}")
+    print(f"Serial ({args.latency_ms:g} ms/read): {result['serial_seconds']:.2f}s over {result['serial_reads']} reads")
+    print(f"Async ({args.latency_ms:g} ms/read): {result['async_seconds']:.2f}s over {result['async_reads']} reads")
+    print(f"Concurrency: peak limit {result['limiter']['peak_limit']}, "
+          f"final limit {result['limiter']['final_limit']}, max in flight {reader.max_in_flight}")
+
+    if failures:
+        sys.exit("Check failed: " + "; ".join(failures))
+
+
+if __name__ == "__main__":
+    main()
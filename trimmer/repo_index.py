@@ -0,0 +1,252 @@
+"""
+Persistent index of repository locations for fast repo-only overviews.
+
+A full repo-mode scan records every repository it finds (path, VCS type,
+directory or archive, nesting, last-seen mtime) together with the mtimes of
+the folders leading to them. A later --repo-only run can then rebuild the
+overview from the index after re-checking only those recorded paths,
+instead of walking the whole tree again.
+"""
+import os
+import json
+from config.config import (
+    REPO_INDEX_FILE,
+    REPO_TYPES,
+    MAX_SCAN_DEPTH,
+    IGNORE_HIDDEN,
+    COLLAPSE_CHAINS,
+)
+
+from .sorting import finder_sort_key
+from .files import is_repo_archive, repo_archive_suffix
+
+INDEX_VERSION = 1
+
+
+def index_settings(ignore_types, ignore_patterns):
+    """
+    Describe the settings that affect which repositories a scan can find.
+
+    An index recorded under different settings is treated as stale. Ignored
+    file types count too: an ignored archive is never checked for a repo.
+    """
+    return {
+        'max_scan_depth': MAX_SCAN_DEPTH,
+        'ignore_hidden': IGNORE_HIDDEN,
+        'collapse_chains': COLLAPSE_CHAINS,
+        'ignore_types': sorted(ignore_types),
+        'ignore_patterns': sorted(ignore_patterns),
+        'repo_types': {k: list(v) for k, v in REPO_TYPES.items()},
+    }
+
+
+def make_repo_record(path, repo_type, kind, nested):
+    """
+    Build an index record for a repository found during a scan.
+
+    Args:
+        path: Absolute path of the repository directory or archive
+        repo_type: VCS type from REPO_TYPES (e.g., 'git')
+        kind: 'directory' or 'archive'
+        nested: True if the repository sits inside another repository
+
+    Returns:
+        Dictionary record, or None if the path can no longer be stat'ed
+    """
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    return {'path': path, 'vcs': repo_type, 'kind': kind, 'nested': nested, 'mtime': mtime}
+
+
+def _load_all():
+    if not os.path.exists(REPO_INDEX_FILE):
+        return {}
+    try:
+        with open(REPO_INDEX_FILE, 'r') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        # Unreadable or corrupted index: behave as if none exists
+        return {}
+    if data.get('version') != INDEX_VERSION:
+        return {}
+    return data.get('roots', {})
+
+
+def load_repo_index(source_dir):
+    """Return the stored index entry for source_dir, or None."""
+    root = os.path.abspath(source_dir)
+    return _load_all().get(root)
+
+
+def save_repo_index(source_dir, records, ignore_types, ignore_patterns):
+    """
+    Store the repositories found by a full scan of source_dir.
+
+    Paths are stored relative to source_dir. Every folder between the root
+    and a repository (excluding repository folders themselves) is recorded
+    with its mtime so the chain can be validated cheaply later.
+    """
+    root = os.path.abspath(source_dir)
+    repos = []
+    ancestors = {}
+
+    for record in records:
+        rel_path = os.path.relpath(os.path.abspath(record['path']), root)
+        repos.append(dict(record, path=rel_path))
+
+        parent = os.path.dirname(rel_path)
+        while True:
+            ancestors.setdefault(parent, None)
+            if not parent:
+                break
+            parent = os.path.dirname(parent)
+
+    # Traversal backends may report repos in different orders
+    repos.sort(key=lambda r: r['path'])
+
+    # Repository folders are validated through their own records
+    repo_dirs = {r['path'] for r in repos if r['kind'] == 'directory'}
+    ancestor_mtimes = {}
+    for rel_path in ancestors:
+        if rel_path in repo_dirs:
+            continue
+        try:
+            ancestor_mtimes[rel_path] = os.stat(os.path.join(root, rel_path)).st_mtime_ns
+        except OSError:
+            continue
+
+    # Root mtime is always recorded, even when no repos were found
+    if '' not in ancestor_mtimes:
+        try:
+            ancestor_mtimes[''] = os.stat(root).st_mtime_ns
+        except OSError:
+            pass
+
+    _store_root(root, {
+        'settings': index_settings(ignore_types, ignore_patterns),
+        'repos': repos,
+        'ancestors': ancestor_mtimes,
+    })
+
+
+def _store_root(root, entry):
+    """Write one root's index entry, keeping the entries of other roots."""
+    all_roots = _load_all()
+    all_roots[root] = entry
+
+    index_dir = os.path.dirname(REPO_INDEX_FILE)
+    if index_dir:
+        os.makedirs(index_dir, exist_ok=True)
+    with open(REPO_INDEX_FILE, 'w') as f:
+        json.dump({'version': INDEX_VERSION, 'roots': all_roots}, f, indent=1)
+
+
+def validate_repo_index(source_dir, index, ignore_types, ignore_patterns):
+    """
+    Check that a stored index still matches the file system.
+
+    Only the recorded paths are stat'ed: every ancestor folder and every
+    repository folder must keep its recorded mtime (a folder's mtime changes
+    when entries are added, removed or renamed in it). An archive whose mtime
+    changed is re-inspected and kept if it still contains a repository; its
+    refreshed record is saved so later runs do not inspect it again.
+
+    A repository created below a folder that is not on a recorded chain is
+    not noticed by this check; run with --rescan to force a full walk.
+
+    Returns:
+        True if the index can be used as-is
+    """
+    if index.get('settings') != index_settings(ignore_types, ignore_patterns):
+        return False
+
+    root = os.path.abspath(source_dir)
+    refreshed = False
+
+    for rel_path, mtime in index.get('ancestors', {}).items():
+        try:
+            if os.stat(os.path.join(root, rel_path)).st_mtime_ns != mtime:
+                return False
+        except OSError:
+            return False
+
+    for record in index.get('repos', []):
+        full_path = os.path.join(root, record['path'])
+        try:
+            mtime = os.stat(full_path).st_mtime_ns
+        except OSError:
+            return False
+        if mtime == record['mtime']:
+            continue
+        if record['kind'] != 'archive':
+            return False
+        still_repo, repo_type = is_repo_archive(full_path)
+        if not still_repo:
+            return False
+        record['vcs'] = repo_type
+        record['mtime'] = mtime
+        refreshed = True
+
+    if refreshed:
+        _store_root(root, index)
+    return True
+
+
+def format_repo_only_lines(source_dir, repos):
+    """
+    Build tree and flat lines showing only repositories and their ancestors.
+
+    Args:
+        source_dir: Root directory the index was built for
+        repos: Index records with paths relative to source_dir
+
+    Returns:
+        Tuple of (tree_lines, flat_lines, stats) in the same line format as
+        process_directory, so the regular formatters can be used.
+    """
+    root = os.path.normpath(os.path.abspath(source_dir))
+
+    # Folder tree: each node holds its subfolders, archives and repo flag
+    def new_node():
+        return {'dirs': {}, 'archives': [], 'is_repo': False}
+
+    tree = new_node()
+    for record in repos:
+        parts = [p for p in record['path'].split(os.sep) if p and p != '.']
+        if not parts:
+            continue
+        node = tree
+        for part in parts[:-1]:
+            node = node['dirs'].setdefault(part, new_node())
+        if record['kind'] == 'archive':
+            node['archives'].append(parts[-1])
+        else:
+            node['dirs'].setdefault(parts[-1], new_node())['is_repo'] = True
+
+    lines = []
+    flat_lines = []
+    stats = {}
+
+    def emit(node, path, level):
+        indent = '  ' * level
+        for name in sorted(node['archives'], key=finder_sort_key):
+            lines.append(f"{indent}  {name}{repo_archive_suffix(name)}")
+            flat_lines.append(os.path.join(path, name))
+            stats['repo_archives_detected'] = stats.get('repo_archives_detected', 0) + 1
+        for name in sorted(node['dirs'], key=finder_sort_key):
+            child = node['dirs'][name]
+            child_path = os.path.join(path, name)
+            label = f"{name}.repo" if child['is_repo'] else name
+            lines.append(f"{indent}  {label}/")
+            flat_lines.append(child_path + '/')
+            if child['is_repo']:
+                stats['repos_detected'] = stats.get('repos_detected', 0) + 1
+            emit(child, child_path, level + 1)
+
+    lines.append(f"{os.path.basename(root)}/")
+    flat_lines.append(root + '/')
+    emit(tree, root, 0)
+
+    return lines, flat_lines, stats
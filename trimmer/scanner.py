@@ -5,9 +5,12 @@ import os
 
 # Import from other modules
 from .filesystem import process_directory
+from .async_scan import process_directory_async
+from .sorting import clear_sort_cache
+from .repo_index import load_repo_index, save_repo_index, validate_repo_index, format_repo_only_lines
 from .utils import initial_count as utils_initial_count
 
-def scan_directory(source_dir, ignore_types, ignore_patterns, enable_repo=False, repo_show_files=False):
+def scan_directory(source_dir, ignore_types, ignore_patterns, enable_repo=False, repo_show_files=False, show_sizes=False, use_async=False):
     """
     Scan a directory and return formatted tree and flat views.
 
@@ -17,20 +20,80 @@ def scan_directory(source_dir, ignore_types, ignore_patterns, enable_repo=False,
         ignore_patterns: List of directory patterns to ignore
         enable_repo: Enable repository detection
         repo_show_files: Show files in repo mode (requires enable_repo=True)
+        show_sizes: Annotate folders with size, file count and newest mtime
+        use_async: Use the asyncio traversal backend (same output, suited
+                   to high-latency mounts)
 
     Returns:
         Tuple of (tree_lines, flat_lines, stats)
+
+    In repo mode the repositories found are also saved to the repo index,
+    so a later --repo-only run can skip the full walk.
     """
     stats = {}
 
+    # Start each scan with fresh sort keys (config or locale may have changed)
+    clear_sort_cache()
+
+    # Collect repo index records while walking (repo mode only)
+    repo_records = [] if enable_repo else None
+
     # Process the directory structure
-    tree_lines, flat_lines, stats = process_directory(source_dir, ignore_types, ignore_patterns,
-                                                       enable_repo=enable_repo, repo_show_files=repo_show_files)
+    if use_async:
+        tree_lines, flat_lines, stats = process_directory_async(source_dir, ignore_types, ignore_patterns,
+                                                                 enable_repo=enable_repo, repo_show_files=repo_show_files,
+                                                                 repo_records=repo_records, show_sizes=show_sizes)
+    else:
+        tree_lines, flat_lines, stats = process_directory(source_dir, ignore_types, ignore_patterns,
+                                                           enable_repo=enable_repo, repo_show_files=repo_show_files,
+                                                           repo_records=repo_records, show_sizes=show_sizes)
+
+    if repo_records is not None:
+        save_repo_index(source_dir, repo_records, ignore_types, ignore_patterns)
 
     # Return both formats and stats
     return tree_lines, flat_lines, stats
 
 
+def scan_repo_only(source_dir, ignore_types, ignore_patterns, force_rescan=False, use_async=False):
+    """
+    Return a view limited to repositories and their ancestor folders.
+
+    The view is built from the repo index when it validates against the file
+    system; otherwise (or when force_rescan is set) a full repo-mode scan
+    rebuilds the index first.
+
+    Args:
+        source_dir: Source directory path
+        ignore_types: List of file types/extensions to ignore
+        ignore_patterns: List of directory patterns to ignore
+        force_rescan: Always walk the full tree, ignoring any stored index
+        use_async: Use the asyncio traversal backend if a walk is needed
+
+    Returns:
+        Tuple of (tree_lines, flat_lines, stats)
+    """
+    clear_sort_cache()
+
+    index = None if force_rescan else load_repo_index(source_dir)
+    if index is not None and validate_repo_index(source_dir, index, ignore_types, ignore_patterns):
+        tree_lines, flat_lines, stats = format_repo_only_lines(source_dir, index['repos'])
+        stats['repo_index_reused'] = 1
+        return tree_lines, flat_lines, stats
+
+    # Index missing, stale or bypassed: full walk (this also saves the index)
+    _, _, scan_stats = scan_directory(source_dir, ignore_types, ignore_patterns, enable_repo=True, use_async=use_async)
+    index = load_repo_index(source_dir)
+    tree_lines, flat_lines, stats = format_repo_only_lines(source_dir, index['repos'])
+
+    # Keep raw totals from the walk; repo counts come from the index view
+    for key in ('raw_total_folders', 'raw_total_files', 'ignored_by_type'):
+        if key in scan_stats:
+            stats[key] = scan_stats[key]
+    stats['repo_index_reused'] = 0
+    return tree_lines, flat_lines, stats
+
+
 def initial_count(source_dir):
     """
     Get initial file and folder counts for the specified directory.
@@ -0,0 +1,291 @@
+"""
+Sharded output: split a large tree into several token-bounded snapshots.
+
+The tree is cut at subtree boundaries. A folder whose subtree fits the token
+budget stays whole; larger folders are descended into, and their small
+children are packed together into shards rooted at that folder. Each shard
+is a standalone YAML snapshot, and an index file lists every shard with its
+root path and token size.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from .formatter import format_tree_as_yaml, estimate_tokens, strip_rollup
+
+POINTER_LINE = "[split into separate shards]"
+
+
+def _line_level(line):
+    return (len(line) - len(line.lstrip())) // 2
+
+
+def _folder_name(line):
+    """Folder name from a tree line, without trailing slash or rollup annotation."""
+    return strip_rollup(line.strip().rstrip('/'))
+
+
+def _subtree_ends(levels):
+    """For each line, the index just past the subtree it starts (one pass)."""
+    ends = [len(levels)] * len(levels)
+    open_lines = []
+    for i, level in enumerate(levels):
+        while open_lines and levels[open_lines[-1]] >= level:
+            ends[open_lines.pop()] = i
+        open_lines.append(i)
+    return ends
+
+
+def _rebase(tree_lines, start, end, root_level):
+    """Re-indent a range so that lines at root_level + 1 land at level 1."""
+    shift = '  ' * root_level
+    return [line[len(shift):] if line.startswith(shift) else line.lstrip()
+            for line in tree_lines[start:end]]
+
+
+def _yaml_shapes(tree_lines, levels):
+    """
+    Describe the YAML that format_tree_as_yaml emits for each tree line.
+
+    Returns (shapes, regular). shapes holds a (base, units) pair per line:
+    a line at level l adds base + 2 * l * units characters, newlines
+    included. regular is False if any line skips a level. A file gives one
+    "- name" entry. A folder gives a "name:" or "name: {}" line, plus the
+    "files:" line of its file list if it has one. For regular trees this is
+    exact. In repo modes, lines inside a repository can skip levels, and the
+    formatter merges them into a shallower folder. Such trees are costed as
+    if every folder were empty and had files, which gives an upper bound.
+    """
+    regular = all(levels[i] <= levels[i - 1] + tree_lines[i - 1].endswith('/')
+                  for i in range(1, len(tree_lines)))
+
+    empty = [regular] * len(tree_lines)
+    has_files = [not regular] * len(tree_lines)
+    if regular:
+        # Last folder line seen at each level: the parent of deeper lines
+        parents = {}
+        for i, line in enumerate(tree_lines):
+            level = levels[i]
+            if level > 0 and level - 1 in parents:
+                empty[parents[level - 1]] = False
+                if not line.endswith('/'):
+                    has_files[parents[level - 1]] = True
+            if line.endswith('/'):
+                parents[level] = i
+
+    shapes = []
+    for i, line in enumerate(tree_lines):
+        text = line.strip()
+        if not line.endswith('/'):
+            # "- name" under its folder's "files:" line
+            shapes.append((len(text) + 5, 1))
+            continue
+        # "name:" (the trailing slash becomes the colon), or "name: {}"
+        base = len(text) + 1 + (3 if empty[i] else 0)
+        units = 1
+        if has_files[i]:
+            # "files:" one level deeper: 2 * (l + 1) + 7 characters
+            base += 9
+            units += 1
+        shapes.append((base, units))
+    return shapes, regular
+
+
+def plan_shards(tree_lines, token_budget):
+    """
+    Split tree lines into shards that each fit the token budget.
+
+    Shard sizes are computed from the tree lines (see _yaml_shapes), so
+    planning does not format anything; each shard is formatted once, when
+    it is written.
+
+    Args:
+        tree_lines: Tree lines as produced by process_directory
+        token_budget: Maximum tokens per shard (including header), as
+            estimate_tokens counts them on the formatted YAML
+
+    Returns:
+        List of (root_path, shard_lines) tuples in tree order: a shard comes
+        before the shards of folders split out of it. A single item larger
+        than the budget (e.g. one huge file list entry) still gets a shard of
+        its own.
+    """
+    if not tree_lines:
+        return []
+
+    levels = [_line_level(line) for line in tree_lines]
+    ends = _subtree_ends(levels)
+    shapes, regular = _yaml_shapes(tree_lines, levels)
+    # estimate_tokens counts len(text) / 4, rounded down
+    char_budget = 4 * (token_budget + 1) - 1 - len(format_tree_as_yaml([]))
+
+    # Prefix sums make the cost of any range, at any re-indentation, O(1)
+    prefix_base, prefix_units, prefix_level_units = [0], [0], [0]
+    for level, (base, units) in zip(levels, shapes):
+        prefix_base.append(prefix_base[-1] + base)
+        prefix_units.append(prefix_units[-1] + units)
+        prefix_level_units.append(prefix_level_units[-1] + level * units)
+
+    def cost(start, end, shift):
+        """Characters of tree_lines[start:end] re-indented by shift levels."""
+        units = prefix_units[end] - prefix_units[start]
+        level_units = prefix_level_units[end] - prefix_level_units[start]
+        return prefix_base[end] - prefix_base[start] + 2 * (level_units - shift * units)
+
+    def root_cost(root_line, with_files):
+        """Characters of a shard's root line (level 0, never shown as {})."""
+        if not regular:
+            with_files = True
+        return len(root_line) + 1 + (9 if with_files else 0)
+
+    def child_items(start, end):
+        """Direct children of a folder's range as (start, end) ranges."""
+        items = []
+        i = start
+        while i < end:
+            item_end = ends[i] if tree_lines[i].endswith('/') else i + 1
+            items.append((i, min(item_end, end)))
+            i = items[-1][1]
+        return items
+
+    def pointer_cost(i, shift):
+        """Characters of an oversized folder's line and its pointer entry."""
+        line = tree_lines[i]
+        level = levels[i] - shift
+        folder = len(line.strip()) + 1 + 9 + (0 if regular else 3) + 4 * level
+        return folder + len(POINTER_LINE) + 5 + 2 * (level + 1)
+
+    shards = []
+
+    def split(start, root_path):
+        """Shard the folder whose line is tree_lines[start]."""
+        end = ends[start]
+        root_level = levels[start]
+        # Keep the folder's rollup annotation (if any) on the shard's root line
+        label = tree_lines[start].strip().rstrip('/')
+        root_line = f"{root_path}{label[len(strip_rollup(label)):]}/"
+
+        whole_cost = root_cost(root_line, shapes[start][1] > 1) + cost(start + 1, end, root_level)
+        if whole_cost <= char_budget:
+            shards.append((root_path, [root_line] + _rebase(tree_lines, start + 1, end, root_level)))
+            return
+
+        # Pending items for the next shard rooted here:
+        # (item_start, lines, is_folder, split_start). split_start is set for a
+        # pointer to an oversized folder, whose shards follow this one.
+        pack = []
+        pack_cost = 0
+        pack_has_files = False
+
+        def flush():
+            if len(pack) == 1 and pack[0][2]:
+                # A lone folder gets a shard rooted at the folder itself
+                item_start = pack[0][0]
+                split(item_start, f"{root_path}/{_folder_name(tree_lines[item_start])}")
+            elif pack:
+                shards.append((root_path, [root_line] + [l for _, lines, _, _ in pack for l in lines]))
+                for _, _, _, split_start in pack:
+                    if split_start is not None:
+                        split(split_start, f"{root_path}/{_folder_name(tree_lines[split_start])}")
+            del pack[:]
+
+        for item_start, item_end in child_items(start + 1, end):
+            line = tree_lines[item_start]
+            is_folder = line.endswith('/')
+            split_start = None
+            item_cost = cost(item_start, item_end, root_level)
+            if is_folder and root_cost(root_line, False) + item_cost > char_budget:
+                # Too big to pack: leave a pointer here and give it its own shards
+                pointer = [line, line[:len(line) - len(line.lstrip())] + "  " + POINTER_LINE]
+                item_lines = _rebase(pointer, 0, 2, root_level)
+                item_cost = pointer_cost(item_start, root_level)
+                split_start = item_start
+                is_folder = False
+            else:
+                item_lines = _rebase(tree_lines, item_start, item_end, root_level)
+
+            is_file = not line.endswith('/')
+            if pack and root_cost(root_line, pack_has_files or is_file) + pack_cost + item_cost > char_budget:
+                flush()
+                pack_cost = 0
+                pack_has_files = False
+            pack.append((item_start, item_lines, is_folder, split_start))
+            pack_cost += item_cost
+            pack_has_files = pack_has_files or is_file
+
+        flush()
+
+    # Each top-level folder line starts its own tree (normally just the root)
+    for item_start, _ in child_items(0, len(tree_lines)):
+        line = tree_lines[item_start]
+        if line.endswith('/'):
+            split(item_start, _folder_name(line))
+
+    return shards
+
+
+def _write_shard(job):
+    """Format one shard and write it to disk (runs in a worker process)."""
+    output_path, shard_lines = job
+    text = format_tree_as_yaml(shard_lines)
+    with open(output_path, 'w') as f:
+        f.write(text)
+    return estimate_tokens(text), len(text.encode('utf-8'))
+
+
+def write_shards(tree_lines, output_dir, base_name, ext, token_budget, workers=0):
+    """
+    Write a sharded snapshot and its index file.
+
+    Args:
+        tree_lines: Tree lines as produced by process_directory
+        output_dir: Directory for the shard and index files
+        base_name: Filename prefix (e.g. "<timestamp> <source> structure_snapshot")
+        ext: File extension without dot
+        token_budget: Maximum estimated tokens per shard
+        workers: Worker processes for formatting (0 = one per CPU)
+
+    Returns:
+        Tuple of (index_path, shards) where shards is a list of dicts with
+        'file', 'root', 'tokens' and 'bytes' keys
+    """
+    planned = plan_shards(tree_lines, token_budget)
+    width = max(2, len(str(len(planned))))
+    jobs = []
+    for number, (_, shard_lines) in enumerate(planned, 1):
+        filename = f"{base_name} part{number:0{width}d}.{ext}"
+        jobs.append((os.path.join(output_dir, filename), shard_lines))
+
+    # Shards are independent, so format and write them in parallel
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            results = list(pool.map(_write_shard, jobs))
+    else:
+        results = [_write_shard(job) for job in jobs]
+
+    shards = []
+    for (root_path, _), (output_path, _), (tokens, size) in zip(planned, jobs, results):
+        shards.append({
+            'file': os.path.basename(output_path),
+            'root': root_path,
+            'tokens': tokens,
+            'bytes': size,
+        })
+
+    index_lines = [
+        "# Index of a sharded TreeTrimmer snapshot.",
+        "# Each shard is a standalone YAML snapshot of the subtree at its root path.",
+        f"# Shards target at most {token_budget:,} tokens; oversized single entries get a shard of their own.",
+        "",
+        "shards:",
+    ]
+    for shard in shards:
+        index_lines.append(f"  - file: {shard['file']}")
+        index_lines.append(f"    root: {shard['root']}")
+        index_lines.append(f"    tokens: {shard['tokens']}")
+
+    index_path = os.path.join(output_dir, f"{base_name} index.{ext}")
+    with open(index_path, 'w') as f:
+        f.write('\n'.join(index_lines) + '\n')
+
+    return index_path, shards
@@ -2,6 +2,9 @@
 Sorting utilities that mimic macOS Finder's sorting behavior.
 """
 import locale
+import re
+
+from config.config import USE_LOCALE_COLLATION, NATURAL_SORT
 
 # Set the locale to match macOS default
 try:
@@ -13,45 +16,108 @@ except locale.Error:
     except locale.Error:
         pass  # If all fails, Python's default sort will be used
 
+# Special characters in macOS Finder order (higher priority characters first)
+# This order matters and follows Finder's sorting
+FINDER_CHAR_ORDER = {
+    '_': 10,  # Underscore comes first in Finder
+    '[': 11,  # Square bracket comes after underscore
+    ']': 12,
+    '.': 13,
+    '-': 14,
+    '~': 15,
+    # Other special characters with lower priority
+    '`': 20, '!': 21, '@': 22, '#': 23, '$': 24, '%': 25, '^': 26, '&': 27,
+    '*': 28, '(': 29, ')': 30, '+': 31, '{': 32, '}': 33, '|': 34, ':': 35,
+    '"': 36, '<': 37, '>': 38, '?': 39, '\\': 40, ';': 41, '\'': 42, ',': 43, '/': 44, ' ': 45
+}
+
+_DIGIT_RUNS = re.compile(r'(\d+)')
+
+# Sort keys computed so far, keyed by name. Each name is collated once per scan
+# and the key is reused by every stage that orders output.
+_sort_key_cache = {}
+
+
+def clear_sort_cache():
+    """Drop cached sort keys (called at the start of each scan)."""
+    _sort_key_cache.clear()
+
+
+def _collate(text):
+    """Transform text for comparison, using locale collation when enabled."""
+    if USE_LOCALE_COLLATION:
+        try:
+            return locale.strxfrm(text)
+        except (ValueError, locale.Error):
+            pass
+    return text
+
+
+def _name_key(lower_name):
+    """
+    Build the comparison key for a lowercased name.
+
+    With NATURAL_SORT enabled, digit runs compare by numeric value so that
+    "file2" sorts before "file10", as in Finder. Text and number runs always
+    alternate (re.split keeps a leading text run, possibly empty), so keys of
+    different names stay comparable element by element.
+
+    A text run followed by a digit run carries a '0' for that boundary, so
+    "a1" compares as "a0..." against names without digits there and still
+    sorts after "a b", "a-b" and "a.txt", like a plain text sort would.
+
+        >>> sorted(['file10', 'file2', 'file1'], key=_name_key)
+        ['file1', 'file2', 'file10']
+        >>> sorted(['ab', 'a1', 'a-b', 'a b'], key=_name_key)
+        ['a b', 'a-b', 'a1', 'ab']
+        >>> sorted(['report1', 'report-final'], key=_name_key)
+        ['report-final', 'report1']
+    """
+    if not NATURAL_SORT:
+        return (_collate(lower_name),)
+
+    parts = _DIGIT_RUNS.split(lower_name)
+    last = len(parts) - 1
+    return tuple(int(part) if i % 2 else _collate(part + '0' if i < last else part)
+                 for i, part in enumerate(parts))
+
+
+def _compute_sort_key(name):
+    first_char = name[0]
+
+    # If it's a special character, sort by its position in the Finder order
+    if first_char in FINDER_CHAR_ORDER:
+        group, order = 0, FINDER_CHAR_ORDER[first_char]
+    # Numbers sort next
+    elif first_char.isdigit():
+        group, order = 1, 0
+    # Everything else (primarily letters) sorts last
+    else:
+        group, order = 2, 0
+
+    # The plain lowercased name breaks ties such as "file02" vs "file2"
+    lower_name = name.lower()
+    return (group, order, _name_key(lower_name), lower_name)
+
+
 def finder_sort_key(name):
     """
     Create a sort key that mimics macOS Finder's sorting behavior.
-    
+
     This ensures special characters like brackets and underscores appear first
-    and in the correct macOS Finder order.
+    and in the correct macOS Finder order. Keys are cached per name, so sorting
+    the same names again (or in a later output stage) does not rebuild them.
     """
     # Guard against None values
     if name is None:
-        return (3, "")
-    
+        return (3, 0, (), "")
+
     # Handle empty strings
     if not name:
-        return (0, "")
-    
-    first_char = name[0]
-    
-    # Special characters in macOS Finder order (higher priority characters first)
-    # This order matters and follows Finder's sorting
-    finder_char_order = {
-        '_': 10,  # Underscore comes first in Finder
-        '[': 11,  # Square bracket comes after underscore
-        ']': 12,
-        '.': 13,
-        '-': 14,
-        '~': 15,
-        # Other special characters with lower priority
-        '`': 20, '!': 21, '@': 22, '#': 23, '$': 24, '%': 25, '^': 26, '&': 27, 
-        '*': 28, '(': 29, ')': 30, '+': 31, '{': 32, '}': 33, '|': 34, ':': 35,
-        '"': 36, '<': 37, '>': 38, '?': 39, '\\': 40, ';': 41, '\'': 42, ',': 43, '/': 44, ' ': 45
-    }
-    
-    # If it's a special character, sort by its position in the Finder order
-    if first_char in finder_char_order:
-        return (0, finder_char_order[first_char], name.lower())
-    
-    # Numbers sort next
-    if first_char.isdigit():
-        return (1, 0, name.lower())
-    
-    # Everything else (primarily letters) sorts last
-    return (2, 0, name.lower())
\ No newline at end of file
+        return (0, 0, (), "")
+
+    key = _sort_key_cache.get(name)
+    if key is None:
+        key = _compute_sort_key(name)
+        _sort_key_cache[name] = key
+    return key
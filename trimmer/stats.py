@@ -1,13 +1,14 @@
 # stats.py
-from config.config import TOKEN_LIMIT
+from config.config import TOKEN_LIMIT, OMITTED_TYPES_TOP_K
+from .formatter import format_rollup, format_type_histogram
 
 def print_stats(stats, tokens, output_size):
     print("Scan complete.\n")
     print("Raw Totals:")
-    print(f"  Folders: {stats['raw_total_folders']}")
-    print(f"  Files: {stats['raw_total_files']}")
+    print(f"  Folders: {stats.get('raw_total_folders', 'N/A')}")
+    print(f"  Files: {stats.get('raw_total_files', 'N/A')}")
     print("\nFiltered Totals (displayed in output):")
-    print(f"  Folders: {stats['raw_total_folders']}")
+    print(f"  Folders: {stats.get('raw_total_folders', 'N/A')}")
     print(f"  Files: {stats.get('filtered_files', 'N/A')}")
     print("Ignored:")
     # Add safe access to prevent KeyError
@@ -25,6 +26,27 @@ def print_stats(stats, tokens, output_size):
     else:
         print(f"  Repos detected (archives): N/A")
 
+    if 'repo_index_reused' in stats:
+        source = "repo index (validated)" if stats['repo_index_reused'] else "full scan (index rebuilt)"
+        print(f"  Repo view source: {source}")
+
+    if 'omitted_types' in stats:
+        # Types behind "[omitted N files]" summaries, overall and per top-level folder
+        top_k = OMITTED_TYPES_TOP_K or 3
+        omitted = stats['omitted_types']
+        print(f"\nOmitted files by type: {sum(omitted.values()):,} ({format_type_histogram(omitted, top_k)})")
+        for folder, counts in stats.get('omitted_by_folder', {}).items():
+            print(f"  {folder}: {sum(counts.values()):,} ({format_type_histogram(counts, top_k)})")
+
+    if 'rollup_bytes' in stats:
+        print(f"\nScanned size: {format_rollup(stats['rollup_bytes'], stats.get('raw_total_files', 0), stats.get('newest_mtime'), stats.get('rollup_partial', 0) > 0)}")
+
     print(f"\nEstimated tokens: {tokens:,}")
     print(f"Output size: {output_size:,} bytes")
-    print(f"Token usage: {(tokens/TOKEN_LIMIT)*100:.1f}% of {TOKEN_LIMIT:,} limit")
\ No newline at end of file
+    if 'shards_written' in stats:
+        # Each shard is loaded on its own, so the largest one is what must fit
+        print(f"Shards written: {stats['shards_written']}")
+        print(f"Largest shard: {stats['largest_shard_tokens']:,} tokens "
+              f"({(stats['largest_shard_tokens']/TOKEN_LIMIT)*100:.1f}% of {TOKEN_LIMIT:,} limit)")
+    else:
+        print(f"Token usage: {(tokens/TOKEN_LIMIT)*100:.1f}% of {TOKEN_LIMIT:,} limit")
\ No newline at end of file